@@ -0,0 +1,17 @@
+"""
+Ahead-of-time compiles the batch resolver used by GRPS.play_batch into the grps_kernels extension module.
+
+    $ python build_grps_ext.py
+
+grps picks up grps_kernels when it is importable, so play_batch never imports numba or JIT-compiles the kernel.
+Requires numba (with numba.pycc) and a C compiler.
+"""
+from numba.pycc import CC
+
+from grps import _resolve_batch, _RESOLVE_BATCH_SIG
+
+cc = CC('grps_kernels')
+cc.export('resolve_batch', _RESOLVE_BATCH_SIG)(_resolve_batch)
+
+if __name__ == '__main__':
+    cc.compile()
@@ -1,15 +1,83 @@
 from __future__ import annotations
 
-from typing import Tuple, List, Dict, NoReturn, Union, Optional
-from random import randint
-from itertools import product
-from networkx import DiGraph as DG
-import networkx as nx
-import pydot
-import matplotlib.pyplot as plt
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Tuple, List, Dict, Mapping, NoReturn, Union, Optional, Iterator
+import numpy as np
 
 _EDGE = Tuple[int, int]
 _NAMED_EDGE = Tuple[str, str]
+_SEED = Optional[Union[int, np.random.Generator]]
+_SAMPLE_BUF_SIZE = 256
+
+_RESOLVE_BATCH_SIG = 'void(int64[:], int64[:], int64[:])'
+
+
+@lru_cache(maxsize=None)
+def _resolve_outcome(n0: int, n1: int) -> int:
+    """
+    given 2 indices
+    n0 - index of 'left' node
+    n1 - index of 'right' node
+    will return winning index or -1 when there's a tie
+
+    the rule does not depend on the game's size (Property 2)
+    indices are expected to be validated by the caller (see GRPS._play_int)"""
+    d = n0 ^ n1
+    if d == 0:
+        return -1
+    hi = n0 if n0 > n1 else n1
+    lo = n0 + n1 - hi
+    # the lowest bit of n0 ^ n1 is set iff the parities differ
+    return lo if (d & 1) else hi
+
+
+def _resolve_array(n0: np.ndarray, n1: np.ndarray) -> np.ndarray:
+    """numpy counterpart of _resolve_outcome for signed int arrays of broadcastable shapes"""
+    diff_par = ((n0 ^ n1) & 1).astype(bool)
+    winner = np.where(diff_par, np.minimum(n0, n1), np.maximum(n0, n1))
+    winner[n0 == n1] = -1
+    return winner
+
+
+def _make_resolve_batch(prange=range):
+    """returns the batch resolver kernel, looping with prange (numba.prange for the parallel JIT build)"""
+
+    def _resolve_batch(n0, n1, out):
+        """writes the winning index of every (n0[k], n1[k]) pair into out[k], -1 on a tie"""
+        for k in prange(n0.size):
+            a, b = n0[k], n1[k]
+            if a == b:
+                out[k] = -1
+            elif (a ^ b) & 1:
+                out[k] = min(a, b)
+            else:
+                out[k] = max(a, b)
+
+    return _resolve_batch
+
+
+# plain python kernel, compiled ahead of time by build_grps_ext.py
+_resolve_batch = _make_resolve_batch()
+
+
+@lru_cache(maxsize=None)
+def _get_kernel():
+    """returns the compiled batch resolver, or None when numba is not installed (play_batch then uses numpy)
+
+    prefers the ahead-of-time build and only falls back to importing numba and compiling the kernel,
+    both on the first call only, so importing grps stays cheap"""
+    try:
+        # ahead-of-time compiled kernel, see build_grps_ext.py
+        from grps_kernels import resolve_batch
+        return resolve_batch
+    except ImportError:
+        pass
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    return njit(_RESOLVE_BATCH_SIG, parallel=True, cache=True)(_make_resolve_batch(prange))
 
 
 class GRPS:
@@ -51,6 +119,10 @@ class GRPS:
         Then set it with:
         >>> game.edge_verbs = dct
 
+        The keys must be exactly the counters listed above. game.edge_verbs then returns a read-only copy,
+        so to change a verb assign a new dict:
+        >>> game.edge_verbs = {**game.edge_verbs, (0, 1): 'pranks'}
+
         And game on!:
         >>> game.play('Jim', 'Dwight')
 
@@ -75,37 +147,59 @@ class GRPS:
         Source: https://math.stackexchange.com/questions/3229686/generalizing-rock-paper-scissors-game
     """
 
-    def __init__(self, n: int):
+    __slots__ = ('n', 'ne', '_winner_table', '_edge_verbs', '_verb_arr', '_msg_table', '_node_names', '_name_to_idx',
+                 '_edge_indices_cache', '_named_edge_indices_cache', '_rng', '_sample_buf', '_sample_idx')
+
+    def __init__(self, n: int, seed: _SEED = None):
+        """seed - optional int or numpy Generator used to sample the random draws, for reproducible games"""
 
         self.n = n
         self.ne = int(self.n * (self.n - 1) / 2)
         assert self.n > 2, f"gRPS is undefined for lists of nodes smaller than 3, got {self.n=}"
         assert self.n % 2 == 1, f"numebr of nodes must be odd, got {self.n=}"
 
+        self._winner_table = self._build_winner_table(self.n)
         self._edge_verbs = None
+        self._verb_arr = None
+        self._msg_table = None
         self._node_names = None
+        self._name_to_idx = None
+        self._edge_indices_cache = None
+        self._named_edge_indices_cache = None
+        self._rng = np.random.default_rng(seed)
+        self._sample_buf = None
+        self._sample_idx = 0
+
+    @staticmethod
+    def _build_winner_table(n: int) -> np.ndarray:
+        """returns a read-only (n, n) table whose [n0, n1] entry is the winning index, -1 on the diagonal"""
+        i = np.arange(n)
+        t = _resolve_array(i[:, None], i[None, :]).astype(np.min_scalar_type(-n))
+        t.flags.writeable = False
+        return t
 
     @classmethod
-    def classic(cls) -> GRPS:
+    def classic(cls, seed: _SEED = None) -> GRPS:
         """the classic rock, paper, scissors"""
-        game = GRPS(3)
+        game = GRPS(3, seed)
         game.node_names = ('scissors', 'paper', 'rock')
         game.edge_verbs = {(0, 1): 'cuts', (1, 2): 'wraps', (2, 0): 'smashes'}
         return game
 
     @classmethod
-    def spock_version(cls) -> GRPS:
+    def spock_version(cls, seed: _SEED = None) -> GRPS:
         """the extended version"""
-        game = GRPS(5)
+        game = GRPS(5, seed)
         game.node_names = ('scissors', 'paper', 'rock', 'lizard', 'spock')
-        game.edge_verbs = {**GRPS.classic().edge_verbs, **{(0, 3): 'cuts', (1, 4): 'proves', (2, 3): 'smashes',
-                                                           (3, 1): 'eats', (3, 4): 'poisons', (4, 0): 'breaks',
-                                                           (4, 2): 'vaporizes'}}
+        game.edge_verbs = {(0, 1): 'cuts', (1, 2): 'wraps', (2, 0): 'smashes',
+                           (0, 3): 'cuts', (1, 4): 'proves', (2, 3): 'smashes',
+                           (3, 1): 'eats', (3, 4): 'poisons', (4, 0): 'breaks',
+                           (4, 2): 'vaporizes'}
         return game
 
     @classmethod
-    def the_office_version(cls) -> GRPS:
-        game = GRPS(7)
+    def the_office_version(cls, seed: _SEED = None) -> GRPS:
+        game = GRPS(7, seed)
         game.node_names = ('Jim', 'Dwight', 'Michael', 'Pam', 'Kevin', 'Andy', 'Angela')
         game.edge_verbs = {(0, 1): 'fools',
                            (0, 3): 'marries',
@@ -132,20 +226,21 @@ class GRPS:
 
     def get_edge_indices(self) -> List[_EDGE]:
         """returns the list of possible 'counter' moves or edges"""
-
-        def f(elem: Tuple[int, int]) -> bool:
-            outcome = self._resolve_outcome(elem[0], elem[1])
-            return elem[0] == outcome
-
-        return [elem for elem in product(range(self.n), range(self.n)) if f(elem)]
+        if self._edge_indices_cache is None:
+            # an edge (i, j) is a cell whose winner is its own row index
+            rows, cols = np.nonzero(self._winner_table == np.arange(self.n)[:, None])
+            self._edge_indices_cache = tuple(zip(rows.tolist(), cols.tolist()))
+        return list(self._edge_indices_cache)
 
     def get_named_edge_indices(self) -> List[Tuple[_EDGE, _NAMED_EDGE]]:
         """returns the list of possible 'counter' moves and their named edges, if it is defined"""
         if self.node_names is None:
             raise Exception('node_names are None')
-        else:
+        elif self._named_edge_indices_cache is None:
             idx = self.get_edge_indices()
-            return list(map(lambda p: (p, (self.node_names[p[0]], self.node_names[p[1]])), idx))
+            self._named_edge_indices_cache = tuple(map(lambda p: (p, (self.node_names[p[0]], self.node_names[p[1]])),
+                                                       idx))
+        return list(self._named_edge_indices_cache)
 
     @property
     def node_names(self) -> List[str]:
@@ -156,67 +251,98 @@ class GRPS:
         assert len(value) == self.n
         assert len(set(value)) == len(value)
         self._node_names = value
+        self._name_to_idx = {name: i for i, name in enumerate(value)}
+        self._msg_table = None
+        self._named_edge_indices_cache = None
 
     @property
-    def edge_verbs(self) -> Dict[_EDGE, str]:
+    def edge_verbs(self) -> Mapping[_EDGE, str]:
+        """read-only copy of the assigned verbs, in-place edits raise TypeError, assign a new dict to change them"""
         return self._edge_verbs
 
     @edge_verbs.setter
     def edge_verbs(self, value: Dict[_EDGE, str]) -> NoReturn:
-        assert len(value) == self.ne
-        self._edge_verbs = value
+        if set(value) != set(self.get_edge_indices()):
+            raise ValueError(f"edge_verbs keys must be exactly the game's edges (see get_edge_indices()), "
+                             f"got {sorted(value)}")
+        arr = np.empty(self.n * self.n, dtype=object)
+        for (i, j), v in value.items():
+            arr[i * self.n + j] = v
+        self._edge_verbs = MappingProxyType(dict(value))
+        self._verb_arr = arr
+        self._msg_table = None
 
     def edge_verb_builder(self) -> NoReturn:
         if self.node_names is None:
             raise Exception('please define the list of node names first')
-        dct = {}
-        itr = 0
-        for ((i, j), (n0, n1)) in self.get_named_edge_indices():
-            itr += 1
-            print(f'edge #{itr}/{self.ne}: {i} -> {j}, {n0} vs. {n1}')
-            dct[(i, j)] = input(f'enter the verb for {n0} -> {n1}')
-        self.edge_verbs = dct
+        prompts = [((i, j), f'edge #{itr}/{self.ne}: {i} -> {j}, {n0} vs. {n1}\nenter the verb for {n0} -> {n1}: ')
+                   for itr, ((i, j), (n0, n1)) in enumerate(self.get_named_edge_indices(), start=1)]
+        self.edge_verbs = {edge: input(prompt) for edge, prompt in prompts}
         print('Your game is now complete.')
 
     def _sample_move(self):
-        """samples from the list of available moves"""
-        return randint(0, self.n - 1)
-
-    def _resolve_outcome(self, n0: int, n1: int) -> int:
+        """samples from the list of available moves, drawing from a refillable buffer of random indices"""
+        if self._sample_buf is None or self._sample_idx == len(self._sample_buf):
+            self._sample_buf = self._rng.integers(0, self.n, size=_SAMPLE_BUF_SIZE, dtype=np.int64).tolist()
+            self._sample_idx = 0
+        move = self._sample_buf[self._sample_idx]
+        self._sample_idx += 1
+        return move
+
+    def play_batch(self, n0: np.ndarray, n1: np.ndarray) -> np.ndarray:
         """
-        given 2 indices
-        n0 - index of 'left' node
-        n1 - index of 'right' node
-        will return winning index or -1 when there's a tie"""
-
-        assert 0 <= n0 <= self.n - 1
-        assert 0 <= n1 <= self.n - 1
-
-        if n0 == n1:
-            return -1
-        elif (n0 % 2) == (n1 % 2):
-            return max(n0, n1)
-        else:
-            return min(n0, n1)
+        vectorized counterpart of _resolve_outcome
+        n0 - int array of 'left' node indices
+        n1 - int array of 'right' node indices
+        will return an array of winning indices, -1 where there's a tie"""
+        n0 = np.asarray(n0)
+        n1 = np.asarray(n1)
+        if n0.shape != n1.shape:
+            raise ValueError(f"shape mismatch, got {n0.shape=}, {n1.shape=}")
+        if not (np.issubdtype(n0.dtype, np.integer) and np.issubdtype(n1.dtype, np.integer)):
+            raise ValueError(f"node indices must be integers, got {n0.dtype=}, {n1.dtype=}")
+        if not (((0 <= n0) & (n0 < self.n)).all() and ((0 <= n1) & (n1 < self.n)).all()):
+            raise ValueError(f"node indices are not in the game's range. n={self.n}")
+        # a signed dtype is needed for the -1 ties
+        n0 = np.asarray(n0, dtype=np.int64)
+        n1 = np.asarray(n1, dtype=np.int64)
+
+        kernel = _get_kernel() if n0.ndim == 1 else None
+        if kernel is not None:
+            n0 = np.ascontiguousarray(n0)
+            n1 = np.ascontiguousarray(n1)
+            out = np.empty_like(n0)
+            kernel(n0, n1, out)
+            return out
+
+        return _resolve_array(n0, n1)
 
     def _play_int(self, i: int, i2: Optional[int] = None) -> Tuple[int, Tuple[int, int]]:
         """returns winning index, and a tuple of the moves (player, pc)"""
-        assert 0 <= i < self.n, f"i is not in the game's range. n={self.n}, got {i=}"
+        if not 0 <= i < self.n:
+            raise ValueError(f"i is not in the game's range. n={self.n}, got {i=}")
         if i2 is None:
             i2 = self._sample_move()
-        else:
-            assert 0 <= i2 < self.n, f"i2 is not in the game's range. n={self.n}, got {i2=}"
+        elif not 0 <= i2 < self.n:
+            raise ValueError(f"i2 is not in the game's range. n={self.n}, got {i2=}")
 
-        outcome = self._resolve_outcome(n0=i, n1=i2)
+        outcome = _resolve_outcome(i, i2)
         return outcome, (i, i2)
 
     def _play_str(self, node: str, node2: Optional[str] = None) -> Tuple[int, Tuple[int, int]]:
-        assert node in self.node_names
-        if node2 is not None:
-            assert node2 in self.node_names
-            return self._play_int(self.node_names.index(node), self.node_names.index(node2))
-        else:
-            return self._play_int(self.node_names.index(node))
+        try:
+            i = self._name_to_idx[node]
+            i2 = None if node2 is None else self._name_to_idx[node2]
+        except KeyError as e:
+            raise ValueError(f"{e.args[0]!r} is not one of the game's node names") from None
+        return self._play_int(i, i2)
+
+    def play_int_fast(self, i: int, i2: int) -> int:
+        """
+        returns the winning index of i vs. i2, or -1 when there's a tie
+        meant for simulations and tournaments: no type dispatch, no validation and no printing,
+        so both indices must already be in range(n)"""
+        return int(self._winner_table[i, i2])
 
     def play(self, move: Union[int, str], move2: Optional[Union[int, str]] = None):
         if isinstance(move, int):
@@ -228,36 +354,55 @@ class GRPS:
             assert self.node_names is not None
             assert self.edge_verbs is not None
             (result, (player_idx, pc_idx)) = self._play_str(move, move2)
-            player = self.node_names[player_idx]
-            pc = self.node_names[pc_idx]
-
-            if result == -1:
-                msg = f'{pc} vs. {pc}, tie!'
-            elif result == player_idx:
-                verb = self.edge_verbs[(player_idx, pc_idx)]
-                if move2 is None:
-                    msg = f'{player} {verb} {pc}, you win!'
-                else:
-                    msg = f'{player} {verb} {pc}, player1 wins!'
-            else:
-                verb = self.edge_verbs[(pc_idx, player_idx)]
-                if move2 is None:
-                    msg = f'{pc} {verb} {player}, you lose!'
+            print(self._message(player_idx, pc_idx, single=move2 is None))
+
+    def _message(self, player_idx: int, pc_idx: int, single: bool) -> str:
+        """returns the outcome message of player_idx vs. pc_idx, building the message table on first use"""
+        if self._msg_table is None:
+            self._msg_table = self._build_messages()
+        return self._msg_table[int(single), player_idx, pc_idx]
+
+    def _build_messages(self) -> np.ndarray:
+        """returns a (2, n, n) table of play() messages indexed by [single, player_idx, pc_idx]"""
+        msgs = np.empty((2, self.n, self.n), dtype=object)
+        for player_idx in range(self.n):
+            for pc_idx in range(self.n):
+                player = self.node_names[player_idx]
+                pc = self.node_names[pc_idx]
+                result = self._winner_table[player_idx, pc_idx]
+
+                if result == -1:
+                    msgs[:, player_idx, pc_idx] = f'{pc} vs. {pc}, tie!'
+                elif result == player_idx:
+                    verb = self._verb_arr[player_idx * self.n + pc_idx]
+                    msgs[1, player_idx, pc_idx] = f'{player} {verb} {pc}, you win!'
+                    msgs[0, player_idx, pc_idx] = f'{player} {verb} {pc}, player1 wins!'
                 else:
-                    msg = f'{pc} {verb} {player}, player2 wins!'
-            print(msg)
+                    verb = self._verb_arr[pc_idx * self.n + player_idx]
+                    msgs[1, player_idx, pc_idx] = f'{pc} {verb} {player}, you lose!'
+                    msgs[0, player_idx, pc_idx] = f'{pc} {verb} {player}, player2 wins!'
+        return msgs
+
+    def _iter_edges_with_verbs(self) -> Iterator[Tuple[int, int, str]]:
+        """yields (i, j, verb) for every edge i -> j"""
+        for i, j in self.get_edge_indices():
+            yield i, j, self._verb_arr[i * self.n + j]
 
     def get_pydot(self):
+        import pydot
+
         graph = pydot.Dot(graph_type='digraph', strict=True)
         for i in range(self.n):
             node = pydot.Node(name=i, label=self.node_names[i])
             graph.add_node(node)
-        for i, j in self.get_edge_indices():
-            edge = pydot.Edge(i, j, label=self.edge_verbs[(i, j)])
+        for i, j, verb in self._iter_edges_with_verbs():
+            edge = pydot.Edge(i, j, label=verb)
             graph.add_edge(edge)
         return graph
 
     def get_nx(self):
+        from networkx import DiGraph as DG
+
         graph = DG()
         for i in range(self.n):
             graph.add_node(self.node_names[i])
@@ -266,10 +411,7 @@ class GRPS:
         return graph
 
     def get_nx_edge_labels(self):
-        ei = self.get_named_edge_indices()
-        ev = self.edge_verbs
-        out = {}
-        for k, v in ei:
-            verb = ev[(k[0], k[1])]
-            out[v] = verb
-        return out
+        names = self.node_names
+        if names is None:
+            raise Exception('node_names are None')
+        return {(names[i], names[j]): verb for i, j, verb in self._iter_edges_with_verbs()}
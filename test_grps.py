@@ -1,6 +1,10 @@
-from grps import GRPS
+from grps import GRPS, _resolve_outcome, _resolve_batch
 from unittest import TestCase
+from unittest.mock import patch
+from contextlib import redirect_stdout
+from io import StringIO
 from typing import Dict
+import numpy as np
 
 
 class TestGRPS(TestCase):
@@ -43,3 +47,133 @@ class TestGRPS(TestCase):
         }
         self.assert_dict_winner(game, dct)
 
+    def test_edge_indices(self):
+        for n in (3, 5, 7, 21):
+            game = GRPS(n)
+            edges = game.get_edge_indices()
+            self.assertEqual(len(edges), game.ne)
+            self.assertEqual(len(set(edges)), game.ne)
+            pairs = {frozenset(edge) for edge in edges}
+            self.assertSetEqual(pairs, {frozenset((i, j)) for i in range(n) for j in range(i + 1, n)})
+            for i, j in edges:
+                self.assertEqual(_resolve_outcome(i, j), i)
+                self.assertEqual(_resolve_outcome(j, i), i)
+
+    def test_play_batch(self):
+        game = GRPS(7)
+        n0, n1 = np.meshgrid(np.arange(game.n), np.arange(game.n), indexing='ij')
+        n0, n1 = n0.ravel(), n1.ravel()
+        expected = [_resolve_outcome(i, j) for i, j in zip(n0.tolist(), n1.tolist())]
+        self.assertListEqual(game.play_batch(n0, n1).tolist(), expected)
+
+    def test_invalid_moves(self):
+        game = GRPS.classic()
+        for move, move2 in ((-1, 0), (3, 0), (0, 3), ('spock', 'rock'), ('rock', 'spock')):
+            with self.assertRaises(ValueError):
+                game.play(move, move2)
+
+    def test_play_int_fast(self):
+        game = GRPS(7)
+        for i in range(game.n):
+            for j in range(game.n):
+                self.assertEqual(game.play_int_fast(i, j), game._play_int(i, j)[0])
+
+    def test_edge_verbs_read_only(self):
+        game = GRPS.classic()
+        with self.assertRaises(TypeError):
+            game.edge_verbs[(0, 1)] = 'snips'
+        game.edge_verbs = {**game.edge_verbs, (0, 1): 'snips'}
+        self.assertEqual(game.get_nx_edge_labels()[('scissors', 'paper')], 'snips')
+
+    def test_edge_indices_are_copies(self):
+        game = GRPS.classic()
+        game.get_edge_indices().append((0, 0))
+        game.get_named_edge_indices().clear()
+        self.assertEqual(len(game.get_edge_indices()), game.ne)
+        self.assertEqual(len(game.get_named_edge_indices()), game.ne)
+
+    def assert_message(self, game: GRPS, expected: str, *moves):
+        out = StringIO()
+        with redirect_stdout(out):
+            game.play(*moves)
+        self.assertEqual(out.getvalue(), expected + '\n')
+
+    def test_play_messages(self):
+        game = GRPS.classic()
+        self.assert_message(game, 'scissors cuts paper, player1 wins!', 'scissors', 'paper')
+        self.assert_message(game, 'scissors cuts paper, player2 wins!', 'paper', 'scissors')
+        self.assert_message(game, 'rock vs. rock, tie!', 'rock', 'rock')
+
+        for pc_idx, expected in ((0, 'rock smashes scissors, you win!'),
+                                 (1, 'paper wraps rock, you lose!'),
+                                 (2, 'rock vs. rock, tie!')):
+            with patch.object(GRPS, '_sample_move', return_value=pc_idx):
+                self.assert_message(game, expected, 'rock')
+
+    def test_play_batch_input(self):
+        game = GRPS(7)
+        n0 = np.array([[0, 1], [2, 6]], dtype=np.uint8)
+        n1 = np.array([[0, 2], [4, 5]], dtype=np.uint8)
+        self.assertListEqual(game.play_batch(n0, n1).tolist(), [[-1, 1], [4, 5]])
+        self.assertListEqual(game.play_batch(n0.ravel(), n1.ravel()).tolist(), [-1, 1, 4, 5])
+        self.assertEqual(game.play_batch(1, 2).shape, ())
+        self.assertEqual(game.play_batch(1, 2), 1)
+        self.assertEqual(game.play_batch(np.uint8(3), 3), -1)
+        self.assertListEqual(game.play_batch(n0[:, 0], n1[:, 0]).tolist(), [-1, 4])
+        for n0, n1 in (([0, 7], [1, 1]), ([0, 1], [-1, 1]), ([0, 1], [0]), ([0.5], [1])):
+            with self.assertRaises(ValueError):
+                game.play_batch(n0, n1)
+
+    def test_seed(self):
+        games = GRPS(21, seed=1), GRPS(21, seed=np.random.default_rng(1))
+        self.assertListEqual(*[[game.play(0)[1][1] for _ in range(600)] for game in games])
+
+    def test_edge_verbs_keys(self):
+        game = GRPS.classic()
+        for dct in ({(1, 0): 'cuts', (2, 1): 'wraps', (0, 2): 'smashes'},
+                    {(0, 1): 'cuts', (1, 2): 'wraps'},
+                    {(0, 1): 'cuts', (1, 2): 'wraps', (2, 0): 'smashes', (0, 3): 'cuts'}):
+            with self.assertRaises(ValueError):
+                game.edge_verbs = dct
+        game = GRPS(7)
+        dct = dict.fromkeys(game.get_edge_indices(), 'beats')
+        del dct[(0, 1)]
+        for key in ((0, 7), (-1, 0)):
+            with self.assertRaises(ValueError):
+                game.edge_verbs = {**dct, key: 'beats'}
+
+    def test_nx_edge_labels_without_names(self):
+        with self.assertRaisesRegex(Exception, 'node_names are None'):
+            GRPS(5).get_nx_edge_labels()
+
+    def test_edge_verb_builder(self):
+        game = GRPS(5)
+        game.node_names = ('a', 'b', 'c', 'd', 'e')
+        edges = game.get_edge_indices()
+        prompts = []
+
+        def answer(prompt):
+            prompts.append(prompt)
+            return f'verb{len(prompts)}'
+
+        with patch('builtins.input', side_effect=answer), redirect_stdout(StringIO()):
+            game.edge_verb_builder()
+
+        names = game.node_names
+        self.assertListEqual(prompts, [f'edge #{k}/{game.ne}: {i} -> {j}, {names[i]} vs. {names[j]}\n'
+                                       f'enter the verb for {names[i]} -> {names[j]}: '
+                                       for k, (i, j) in enumerate(edges, start=1)])
+        self.assertDictEqual(dict(game.edge_verbs), {edge: f'verb{k}' for k, edge in enumerate(edges, start=1)})
+        self.assertSetEqual(set(game.edge_verbs), set(edges))
+
+    def test_winner_rule_parity(self):
+        for n in (3, 5, 7, 21, 129):
+            game = GRPS(n)
+            n0, n1 = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+            table = game._winner_table.tolist()
+            self.assertListEqual([[_resolve_outcome(i, j) for j in range(n)] for i in range(n)], table)
+            self.assertListEqual(game.play_batch(n0, n1).tolist(), table)
+            self.assertListEqual(game.play_batch(n0.ravel(), n1.ravel()).tolist(), sum(table, []))
+            out = np.empty(n * n, dtype=np.int64)
+            _resolve_batch(n0.ravel(), n1.ravel(), out)
+            self.assertListEqual(out.tolist(), sum(table, []))